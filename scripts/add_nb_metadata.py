@@ -2,7 +2,7 @@ import json
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 import nbformat
-import re
+from notebook_index import get_notebook_record
 
 DEFAULT_AUTHORS = [{
     "name": "Sherratt, Tim",
@@ -13,19 +13,18 @@ DEFAULT_AUTHORS = [{
 def main():
     notebooks = get_notebooks()
     for notebook in notebooks:
+        record = get_notebook_record(notebook)
+        metadata = {"name": record["title"], "author": DEFAULT_AUTHORS}
+        # Only rewrite notebooks that need changing, so their index records stay valid
+        if record["rocrate"] == metadata:
+            continue
         nb = nbformat.read(notebook, nbformat.NO_CONVERT)
-        title = extract_notebook_title(nb)
-        metadata = {"name": title, "author": DEFAULT_AUTHORS}
         nb.metadata.rocrate = metadata
         # print(nb.metadata)
         nbformat.write(nb, notebook, nbformat.NO_CONVERT)
+        # Refresh the index record now the notebook's contents have changed
+        get_notebook_record(notebook)
 
-def extract_notebook_title(nb):
-    md_cells = [c for c in nb.cells if c["cell_type"] == "markdown"]
-    for cell in md_cells:
-        if title := re.search(r"^# (.+)(\n|$)", cell["source"]):
-            return title.group(1)
-        
 def get_notebooks():
     """
     Returns a list of paths to jupyter notebooks in the current directory
@@ -1,10 +1,62 @@
 import nbformat
 from nbconvert import HTMLExporter
 from nbconvert.preprocessors import ExecutePreprocessor
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import argparse
+import hashlib
+import json
+import time
+from notebook_index import get_notebook_record
 
-def main(path):
+MANIFEST = "manifest.json"
+
+
+def hash_notebook(nb_path):
+    """
+    Returns a hash of the notebook's content, used to detect changes between runs.
+    """
+    return hashlib.sha256(nb_path.read_bytes()).hexdigest()
+
+
+def load_manifest(output):
+    """
+    Load the hashes of the notebooks rendered in previous runs.
+    """
+    try:
+        return json.loads(Path(output, MANIFEST).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def needs_preview(nb_path):
+    """
+    Check the notebook index to see if this notebook should have a preview.
+    Notebooks without rocrate metadata and Voila apps are skipped.
+    """
+    metadata = get_notebook_record(nb_path)["rocrate"]
+    return metadata is not None and not metadata.get("softwareRequirements") == "Voila"
+
+
+def render_preview(nb_path, output):
+    """
+    Export a notebook as a HTML preview, returning the time taken to render.
+    """
+    start = time.perf_counter()
+    with nb_path.open() as f:
+        nb = nbformat.read(f, as_version=4)
+        #ep = ExecutePreprocessor(skip_cells_with_tag="nbval-skip")
+        #ep.preprocess(nb, {'metadata': {'path': '.'}})
+    html_exporter = HTMLExporter(embed_images=True)
+
+    # 3. Process the notebook we loaded earlier
+    (body, resources) = html_exporter.from_notebook_node(nb)
+
+    Path(output, f"{nb_path.stem}.html").write_text(body)
+    return time.perf_counter() - start
+
+
+def main(path, workers=None, force=False):
     if path:
         output = Path(path, "previews")
     else:
@@ -12,31 +64,48 @@ def main(path):
     output.mkdir(exist_ok=True)
 
     nbs = [n for n in Path(".").glob("*.ipynb") if not n.name.startswith(("index.", "draft", "Untitled", "snippets"))]
-    for nb_path in nbs:
-        print(nb_path.name)
-        with nb_path.open() as f:
-            nb = nbformat.read(f, as_version=4)
-            #ep = ExecutePreprocessor(skip_cells_with_tag="nbval-skip")
-            #ep.preprocess(nb, {'metadata': {'path': '.'}})
-            try:
-                metadata = nb.metadata.rocrate
-            except AttributeError:
-                pass
-            else:
-                if not metadata.get("softwareRequirements") == "Voila":
-                    html_exporter = HTMLExporter(embed_images=True)
+    hashes = {nb_path.name: hash_notebook(nb_path) for nb_path in nbs}
+    manifest = load_manifest(output)
 
-                    # 3. Process the notebook we loaded earlier
-                    (body, resources) = html_exporter.from_notebook_node(nb)
+    # Only render notebooks that have changed since the last run
+    changed = [nb_path for nb_path in nbs if force or manifest.get(nb_path.name) != hashes[nb_path.name]]
+    print(f"Rendering {len(changed)} of {len(nbs)} notebooks")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for nb_path in changed:
+            if needs_preview(nb_path):
+                futures[executor.submit(render_preview, nb_path, output)] = nb_path
+            else:
+                print(f"{nb_path.name}: skipped")
+                manifest[nb_path.name] = hashes[nb_path.name]
+        for future in as_completed(futures):
+            nb_path = futures[future]
+            try:
+                duration = future.result()
+            except Exception as e:
+                # Leave it out of the manifest so it's tried again next time
+                print(f"{nb_path.name}: failed ({e})")
+                continue
+            print(f"{nb_path.name}: {duration:.2f}s")
+            manifest[nb_path.name] = hashes[nb_path.name]
 
-                    Path(output, f"{nb_path.stem}.html").write_text(body)
+    # Drop notebooks that no longer exist
+    manifest = {name: nb_hash for name, nb_hash in manifest.items() if name in hashes}
+    Path(output, MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--path", type=str, help="Path to save", required=False
     )
+    parser.add_argument(
+        "--workers", type=int, help="Number of notebooks to render in parallel", required=False
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Render all notebooks, even if they haven't changed"
+    )
     args = parser.parse_args()
-    main(args.path)
+    main(args.path, args.workers, args.force)
 
 # FOR VOILA NBS use jupyter nbconvert querypic.ipynb --execute --no-input --to html --template=material
\ No newline at end of file
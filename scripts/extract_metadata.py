@@ -1,5 +1,4 @@
-import nbformat
-import re
+from notebook_index import get_notebook_record
 
 LISTIFY = ["author", "object", "result"]
 
@@ -9,12 +8,6 @@ def listify(value):
         return [value]
     return value
 
-def extract_notebook_title(nb):
-    md_cells = [c for c in nb.cells if c["cell_type"] == "markdown"]
-    for cell in md_cells:
-        if title := re.search(r"^# (.+)(\n|$)", cell["source"]):
-            return title.group(1)
-
 
 def extract_notebook_metadata(notebook, keys):
     """Attempts to extract metadata from the notebook.
@@ -29,12 +22,9 @@ def extract_notebook_metadata(notebook, keys):
     """
     print(notebook)
     result = {}
-    nb = nbformat.read(notebook, nbformat.NO_CONVERT)
-    try:
-        metadata = nb.metadata.rocrate
-    except AttributeError:
-        pass
-    else:
+    # Metadata is read from the notebook index rather than parsing the notebook again
+    metadata = get_notebook_record(notebook)["rocrate"]
+    if metadata is not None:
         for key, default in keys.items():
             if key in LISTIFY:
                 result[key] = listify(metadata.get(key, default))
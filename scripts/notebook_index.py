@@ -0,0 +1,71 @@
+import hashlib
+import json
+from pathlib import Path
+import nbformat
+import re
+
+# Cache of notebook metadata shared by the scripts, so each notebook is only parsed once
+INDEX_FILE = Path(".notebook_index.json")
+
+_index = None
+
+
+def load_index():
+    """
+    Load the notebook index saved by previous runs.
+    """
+    global _index
+    if _index is None:
+        try:
+            _index = json.loads(INDEX_FILE.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            _index = {}
+    return _index
+
+
+def save_index():
+    INDEX_FILE.write_text(json.dumps(load_index(), indent=2, sort_keys=True))
+
+
+def extract_notebook_title(nb):
+    md_cells = [c for c in nb.cells if c["cell_type"] == "markdown"]
+    for cell in md_cells:
+        if title := re.search(r"^# (.+)(\n|$)", cell["source"]):
+            return title.group(1)
+
+
+def index_notebook(notebook, nb_hash):
+    """
+    Parse a notebook and extract the metadata used by the scripts.
+    """
+    nb = nbformat.read(notebook, nbformat.NO_CONVERT)
+    rocrate = nb.metadata.get("rocrate")
+    return {
+        "hash": nb_hash,
+        "title": extract_notebook_title(nb),
+        "rocrate": rocrate,
+        "actions": rocrate.get("action", []) if rocrate else [],
+        "examples": rocrate.get("workExample", []) if rocrate else [],
+    }
+
+
+def get_notebook_record(notebook):
+    """
+    Get the indexed metadata of a notebook.
+    The notebook is only parsed if its content has changed since it was last indexed.
+
+    Parameters:
+        notebook: The path to the jupyter notebook
+
+    Returns:
+        A dictionary with the notebook's hash, title, rocrate metadata, actions, and examples.
+    """
+    notebook = Path(notebook)
+    index = load_index()
+    nb_hash = hashlib.sha256(notebook.read_bytes()).hexdigest()
+    record = index.get(notebook.name)
+    if not record or record["hash"] != nb_hash:
+        record = index_notebook(notebook, nb_hash)
+        index[notebook.name] = record
+        save_index()
+    return record
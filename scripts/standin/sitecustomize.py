@@ -0,0 +1,35 @@
+# Redirects requests for Trove to the local stand-in server (see scripts/trove_standin.py).
+# Add this directory to PYTHONPATH and set TROVE_STANDIN to the stand-in's url, eg:
+#   TROVE_STANDIN=http://localhost:8765 PYTHONPATH=scripts/standin GW_STATUS=dev pytest --nbval-lax
+import os
+from urllib.parse import urlsplit
+
+TROVE_STANDIN = os.getenv("TROVE_STANDIN")
+TROVE_HOSTS = ["api.trove.nla.gov.au", "trove.nla.gov.au", "nla.gov.au"]
+
+if TROVE_STANDIN:
+    from requests.adapters import HTTPAdapter
+
+    _send = HTTPAdapter.send
+
+    def send(self, request, **kwargs):
+        """
+        Send requests for Trove hosts to the stand-in instead.
+        The original url is restored on the response, so redirects and code that
+        reads `response.url` behave just as they would with Trove.
+        """
+        url = urlsplit(request.url)
+        if url.hostname not in TROVE_HOSTS:
+            return _send(self, request, **kwargs)
+        original_url = request.url
+        request.url = f"{TROVE_STANDIN}/{url.netloc}{url.path}" + (
+            f"?{url.query}" if url.query else ""
+        )
+        try:
+            response = _send(self, request, **kwargs)
+        finally:
+            request.url = original_url
+        response.url = original_url
+        return response
+
+    HTTPAdapter.send = send
@@ -0,0 +1,277 @@
+"""
+A local stand-in for the Trove API and website that replays recorded responses,
+so notebooks can be tested and benchmarked without a network connection or an API key.
+
+Requests are sent to the stand-in as http://localhost:8765/[host]/[path]?[query].
+The hook in scripts/standin/sitecustomize.py redirects requests for Trove hosts there,
+so the notebooks don't have to be changed.
+
+Record responses by running the notebooks' test cells through the stand-in:
+
+    python scripts/trove_standin.py record
+    TROVE_STANDIN=http://localhost:8765 PYTHONPATH=scripts/standin GW_STATUS=dev pytest --nbval-lax harvest-aww-covers-and-newspaper-front-pages.ipynb
+
+Then replay them offline (set TROVE_API_KEY to anything), adding latency, rate limits and errors as required:
+
+    python scripts/trove_standin.py replay --latency 0.2 --jitter 0.1 --rate-limit 10 --inject 503:0.05 --inject 423:0.5:.ping
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+
+import requests
+
+RECORDINGS = Path("data", "standin")
+
+# Parameters that don't change the response, so are left out of the recording keys
+IGNORED_PARAMS = {"key"}
+
+# Request headers passed on to Trove when recording
+FORWARD_HEADERS = ["X-API-KEY", "Accept", "User-Agent"]
+
+# Response headers saved with the recordings
+SAVED_HEADERS = ["Content-Type", "Location", "Retry-After"]
+
+
+def get_recording_key(host, path, query):
+    """
+    Create a key for a request from its host, path, and sorted query parameters.
+    """
+    params = sorted(
+        (name, value)
+        for name, value in parse_qsl(query, keep_blank_values=True)
+        if name not in IGNORED_PARAMS
+    )
+    return hashlib.sha256(json.dumps([host, path, params]).encode()).hexdigest()
+
+
+class Recordings:
+    """
+    Recorded responses, saved as a JSON index and a body file for each response.
+    A request can have a sequence of responses (for example, a PDF that isn't ready until it's been pinged a few times).
+    When replaying, the responses are returned in order, and the last one is repeated.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.recorded = set()
+
+    def load(self, key):
+        try:
+            return json.loads(Path(self.path, f"{key}.json").read_text())
+        except FileNotFoundError:
+            return None
+
+    def replay(self, key):
+        """
+        Get the next recorded response for a request, or None if it hasn't been recorded.
+        """
+        recording = self.load(key)
+        if not recording:
+            return None
+        with self.lock:
+            call = self.calls.get(key, 0)
+            self.calls[key] = call + 1
+        response = recording["responses"][min(call, len(recording["responses"]) - 1)]
+        body = Path(self.path, response["body"]).read_bytes()
+        return response["status"], response["headers"], body
+
+    def record(self, key, url, status, headers, body):
+        """
+        Save a response. The first response to a request in each recording session replaces any earlier recordings.
+        """
+        with self.lock:
+            recording = self.load(key) if key in self.recorded else None
+            if not recording:
+                recording = {"url": url, "responses": []}
+                self.recorded.add(key)
+            body_file = f"{key}-{len(recording['responses'])}.body"
+            Path(self.path, body_file).write_bytes(body)
+            recording["responses"].append(
+                {"status": status, "headers": headers, "body": body_file}
+            )
+            Path(self.path, f"{key}.json").write_text(json.dumps(recording, indent=2))
+
+
+class RateLimiter:
+    """
+    A token bucket allowing `rate` requests per second, with bursts of up to `rate` requests.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+def parse_injection(rule):
+    """
+    Parse an error injection rule in the form STATUS:PROBABILITY[:PATH], eg '503:0.05' or '423:0.5:.ping'.
+    If PATH is given, errors are only injected into requests with urls that contain it.
+    """
+    status, probability, *path = rule.split(":", 2)
+    return int(status), float(probability), path[0] if path else ""
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    # These are set on the handler class by main()
+    mode = "replay"
+    recordings = None
+    latency = 0
+    jitter = 0
+    rate_limiter = None
+    injections = []
+    random = random.Random()
+    random_lock = threading.Lock()
+
+    def send(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        body = json.dumps({"status": status, "message": message}).encode()
+        self.send(status, {"Content-Type": "application/json"}, body)
+
+    def get_injected_error(self, url):
+        for status, probability, path in self.injections:
+            with self.random_lock:
+                roll = self.random.random()
+            if path in url and roll < probability:
+                return status
+
+    def forward(self, host, path, query):
+        """
+        Pass the request on to Trove and return the response.
+        Redirects aren't followed, so the client sees them just as it would from Trove.
+        """
+        url = f"https://{host}{path}" + (f"?{query}" if query else "")
+        headers = {
+            name: self.headers[name] for name in FORWARD_HEADERS if self.headers[name]
+        }
+        response = requests.get(
+            url, headers=headers, allow_redirects=False, timeout=120
+        )
+        saved_headers = {
+            name: response.headers[name]
+            for name in SAVED_HEADERS
+            if name in response.headers
+        }
+        return url, response.status_code, saved_headers, response.content
+
+    def do_GET(self):
+        if self.latency or self.jitter:
+            with self.random_lock:
+                delay = self.latency + self.random.uniform(0, self.jitter)
+            time.sleep(delay)
+        if self.rate_limiter and not self.rate_limiter.allow():
+            self.send(429, {"Retry-After": "1"}, b"")
+            return
+        if error := self.get_injected_error(self.path):
+            self.send_error_json(error, "Injected error")
+            return
+        url = urlsplit(self.path)
+        try:
+            host, path = url.path.lstrip("/").split("/", 1)
+        except ValueError:
+            host, path = url.path.lstrip("/"), ""
+        key = get_recording_key(host, f"/{path}", url.query)
+        if self.mode == "record":
+            url, status, headers, body = self.forward(host, f"/{path}", url.query)
+            self.recordings.record(key, url, status, headers, body)
+        else:
+            response = self.recordings.replay(key)
+            if not response:
+                self.send_error_json(404, f"No recording for {self.path}")
+                return
+            status, headers, body = response
+        self.send(status, headers, body)
+
+    do_HEAD = do_GET
+
+
+def main(mode, port, recordings, latency, jitter, rate_limit, injections, seed):
+    StandinHandler.mode = mode
+    StandinHandler.recordings = Recordings(recordings)
+    StandinHandler.latency = latency
+    StandinHandler.jitter = jitter
+    StandinHandler.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+    StandinHandler.injections = [parse_injection(rule) for rule in injections]
+    StandinHandler.random = random.Random(seed)
+    server = ThreadingHTTPServer(("localhost", port), StandinHandler)
+    print(f"Trove stand-in ({mode}) running at http://localhost:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--recordings",
+        type=str,
+        default=str(RECORDINGS),
+        help="Directory of recorded responses",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="Seconds to wait before each response"
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0,
+        help="Maximum random seconds added to the latency",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        help="Requests per second allowed before returning 429 errors",
+    )
+    parser.add_argument(
+        "--inject",
+        action="append",
+        default=[],
+        help="Inject errors, eg 503:0.05 or 423:0.5:.ping (STATUS:PROBABILITY[:PATH])",
+    )
+    parser.add_argument(
+        "--seed", type=int, help="Random seed, so latency and errors can be reproduced"
+    )
+    args = parser.parse_args()
+    main(
+        args.mode,
+        args.port,
+        args.recordings,
+        args.latency,
+        args.jitter,
+        args.rate_limit,
+        args.inject,
+        args.seed,
+    )
@@ -1,7 +1,12 @@
 import os
 import argparse
 import datetime
+import functools
+import json
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 from giturlparse import parse as ghparse
 from git import Repo
 from pathlib import Path
@@ -18,6 +23,23 @@ load_dotenv()
 
 NOTEBOOK_EXTENSION = ".ipynb"
 
+# Persistent cache of file stats, keyed by local path or by url
+STATS_CACHE = Path(".file_stats_cache.json")
+
+# Number of data files to resolve in parallel
+MAX_WORKERS = 8
+
+# Read size used when counting rows in local files
+CHUNK_SIZE = 1024 * 1024
+
+# A single pooled session is shared by all requests
+session = requests.Session()
+retries = Retry(total=5, backoff_factor=1, status_forcelist=[502, 503, 504])
+session.mount("https://", HTTPAdapter(max_retries=retries, pool_maxsize=MAX_WORKERS))
+session.mount("http://", HTTPAdapter(max_retries=retries, pool_maxsize=MAX_WORKERS))
+
+stats_cache = {}
+
 DEFAULT_LICENCE = {
     "@id": "https://spdx.org/licenses/MIT",
     "name": "MIT License",
@@ -78,8 +100,10 @@ def main(version, data_repo):
     os.chdir(Path(__file__).resolve().parent.parent)
     # Get a list of paths to notebooks in the cwd
     notebooks = get_notebooks()
+    stats_cache.update(load_stats_cache())
     # Update the crate
     update_crate(version, data_repo, notebooks)
+    save_stats_cache()
 
 
 def get_notebooks():
@@ -166,9 +190,101 @@ def find_local_file(file_name, local_path):
         return file_path
 
 
+def load_stats_cache():
+    """
+    Load file stats saved by previous runs.
+    """
+    try:
+        return json.loads(STATS_CACHE.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_stats_cache():
+    STATS_CACHE.write_text(json.dumps(stats_cache, indent=2, sort_keys=True))
+
+
+def github_headers():
+    """
+    Authenticate GitHub API requests if there's a token available (this raises the rate limit).
+    """
+    if token := os.getenv("GITHUB_TOKEN"):
+        return {"Authorization": f"token {token}"}
+    return {}
+
+
+def cached_request(method, url, extract, headers=None):
+    """
+    Make a conditional request using the ETag saved from the last run.
+    If the resource hasn't changed (304) the cached value is returned, otherwise the
+    value returned by `extract` from the response is cached and returned.
+    GitHub doesn't count 304 responses against the API rate limit.
+    """
+    key = f"{method} {url}"
+    cached = stats_cache.get(key)
+    headers = dict(headers or {})
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    response = session.request(method, url, headers=headers, timeout=60)
+    if cached and response.status_code == 304:
+        return cached["value"]
+    value = extract(response)
+    if response.ok:
+        stats_cache[key] = {"etag": response.headers.get("ETag"), "value": value}
+    return value
+
+
+def count_rows(file_path):
+    """
+    Count the lines in a file by reading it as binary chunks,
+    which is much faster than iterating over lines of text.
+    """
+    rows = 0
+    last_chunk = b""
+    with file_path.open("rb") as df:
+        while chunk := df.read(CHUNK_SIZE):
+            rows += chunk.count(b"\n")
+            last_chunk = chunk
+    # Include a final line that doesn't end with a newline
+    if last_chunk and not last_chunk.endswith(b"\n"):
+        rows += 1
+    return rows
+
+
+def get_cached_rows(local_file, stats):
+    """
+    Get the number of rows in a local file, reusing the cached value if the file hasn't been modified.
+    """
+    key = str(local_file.resolve())
+    cached = stats_cache.get(key)
+    if cached and cached["mtime"] == stats.st_mtime_ns and cached["size"] == stats.st_size:
+        return cached["rows"]
+    rows = count_rows(local_file)
+    stats_cache[key] = {"mtime": stats.st_mtime_ns, "size": stats.st_size, "rows": rows}
+    return rows
+
+
+def get_commit_date(response):
+    try:
+        # Get the date of the last commit
+        return response.json()[0]["commit"]["committer"]["date"][:10]
+    except (IndexError, KeyError, ValueError):
+        return None
+
+
+def get_content_size(response):
+    try:
+        return response.json()["size"]
+    except (TypeError, KeyError, ValueError):
+        return None
+
+
+@functools.cache
 def get_file_stats(datafile, local_path):
     """
     Try to get the file size and last modified date of the datafile.
+    Results are memoised, so the stats of all data files can be resolved
+    in parallel by `resolve_file_stats` before the crate is assembled.
     """
     file_name = datafile.rstrip("/").split("/")[-1]
     local_file = find_local_file(file_name, local_path)
@@ -188,10 +304,7 @@ def get_file_stats(datafile, local_path):
         if local_file.name.endswith((".zip", ".db")):
             rows = ""
         else:
-            rows = 0
-            with local_file.open("r") as df:
-                for line in df:
-                    rows += 1
+            rows = get_cached_rows(local_file, stats)
     elif datafile.startswith("http"):
         # I don't think I want to download the whole file, so set to None
         rows = None
@@ -202,47 +315,55 @@ def get_file_stats(datafile, local_path):
             gh_parts = ghparse(datafile)
 
             # API url to get the latest commit for this file
-            gh_commit_url = f"https://api.github.com/repos/{gh_parts.owner}/{gh_parts.repo}/commits?path={gh_parts.path_raw.split('/')[-1]}"
-            try:
-                response = requests.get(gh_commit_url)
-
-                # Get the date of the last commit
-                date = response.json()[0]["commit"]["committer"]["date"][:10]
-
-            except (IndexError, KeyError):
-                date = None
+            gh_commit_url = f"https://api.github.com/repos/{gh_parts.owner}/{gh_parts.repo}/commits?path={gh_parts.path_raw.split('/')[-1]}&per_page=1"
+            date = cached_request("GET", gh_commit_url, get_commit_date, github_headers())
 
             # Different API endpoint for file data
             gh_file_url = f"https://api.github.com/repos/{gh_parts.owner}/{gh_parts.repo}/contents/{gh_parts.path_raw.split('/')[-1]}"
-            try:
-                response = requests.get(gh_file_url)
-                contents_data = response.json()
-                # Get the file size
-                try:
-                    size = contents_data["size"]
-                except TypeError:
-                    size = None
-
-            except KeyError:
-                size = None
+            # Get the file size
+            size = cached_request("GET", gh_file_url, get_content_size, github_headers())
 
         else:
             # If the file is online, get size from content headers
-            size = requests.head(datafile).headers.get("Content-length")
+            size = cached_request("HEAD", datafile, lambda response: response.headers.get("Content-length"))
             date = None
 
     return date, size, rows
 
 
+def resolve_file_stats(notebooks, data_repo):
+    """
+    Get the stats of every data file referenced by the notebooks' actions in parallel.
+    The results are memoised by `get_file_stats`, so they're ready when the files are added to the crate.
+    Only files that `add_files` will add (existing files, urls, and data repo files) are included.
+    """
+    datafiles = set()
+    for notebook in notebooks:
+        notebook_metadata = extract_notebook_metadata(notebook, {"action": []})
+        for action in notebook_metadata.get("action", []):
+            local_path = action.get("local_path", ".")
+            for data_type in ["object", "result"]:
+                for df_data in action.get(data_type, []):
+                    datafile = df_data["url"]
+                    if (
+                        Path(datafile).exists()
+                        or (datafile.startswith("http"))
+                        or (data_repo and data_repo in datafile)
+                    ):
+                        datafiles.add((datafile, local_path))
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        list(executor.map(lambda args: get_file_stats(*args), datafiles))
+
+
+@functools.cache
 def get_default_gh_branch(url):
     # Process GitHub links
     if "github.com" in url:
         # the ghparser doesn't seem to like 'raw' urls
         url = url.replace("/raw/", "/blob/")
         gh_parts = ghparse(url)
-        headers = {'Authorization': f'token {os.getenv("GITHUB_TOKEN")}'}
         gh_repo_url = f"https://api.github.com/repos/{gh_parts.owner}/{gh_parts.repo}"
-        response = requests.get(gh_repo_url, headers=headers)
+        response = session.get(gh_repo_url, headers=github_headers())
         return response.json().get("default_branch")
 
 def add_files(crate, action, data_type, gw_url, data_repo, local_path):
@@ -684,7 +805,7 @@ def add_gw_page_link(crate, doc_url):
     add_context_entity(crate, nd_docs)
 
 def get_page_title(url):
-    response = requests.get(url)
+    response = session.get(url)
     if response.ok:
         soup = BeautifulSoup(response.text, features="lxml")
         return soup.title.string.split(" - ")[0].strip()
@@ -815,6 +936,9 @@ def update_crate(version, data_repo, notebooks):
     # Add Python for programming language
     add_context_entity(crate, PYTHON)
 
+    # Get stats for all the data files before processing notebooks
+    resolve_file_stats(notebooks, data_repo)
+
     # Process notebooks
     for notebook in notebooks:
         add_notebook(crate, notebook, data_repo, gw_url)
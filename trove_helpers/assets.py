@@ -0,0 +1,156 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+# Page images and PDFs are kept in a shared asset store, so they only have to be downloaded once
+ASSET_DIR = Path("data", "assets")
+ASSET_MANIFEST = Path(ASSET_DIR, "manifest.db")
+
+# The least recently used assets are removed when the store gets bigger than this (in bytes)
+ASSET_DIR_MAX_SIZE = 5 * 1024**3
+
+# Assets are never saved in a notebook's requests cache -- the store replaces it
+s = requests.Session()
+retries = Retry(total=5, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
+s.mount("http://", HTTPAdapter(max_retries=retries))
+s.mount("https://", HTTPAdapter(max_retries=retries))
+
+
+def open_asset_manifest():
+    """
+    Open the asset store's manifest, creating it if necessary.
+    The manifest records the content hash, size, and last use of every stored asset,
+    keyed by the type of resource, its Trove identifier, and its level (size).
+    """
+    ASSET_DIR.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(ASSET_MANIFEST, timeout=60)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS assets (type TEXT, trove_id TEXT, level TEXT, hash TEXT, size INTEGER, last_used REAL, PRIMARY KEY (type, trove_id, level))"
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS assets_hash ON assets (hash)")
+    db.execute("CREATE INDEX IF NOT EXISTS assets_last_used ON assets (last_used)")
+    return db
+
+
+def get_asset_path(content_hash):
+    """
+    Files are saved under the hash of their contents, so identical files are only stored once.
+    """
+    return Path(ASSET_DIR, content_hash[:2], content_hash)
+
+
+def find_asset(asset_type, trove_id, level=""):
+    """
+    Look up an asset in the manifest.
+    Returns the path of the stored file, or None if it's not in the store.
+    """
+    key = (asset_type, str(trove_id), str(level))
+    with closing(open_asset_manifest()) as db:
+        row = db.execute(
+            "SELECT hash FROM assets WHERE type = ? AND trove_id = ? AND level = ?", key
+        ).fetchone()
+        if row and get_asset_path(row[0]).exists():
+            with db:
+                db.execute(
+                    "UPDATE assets SET last_used = ? WHERE type = ? AND trove_id = ? AND level = ?",
+                    (time.time(), *key),
+                )
+            return get_asset_path(row[0])
+
+
+def evict_assets(db, keep, max_size=ASSET_DIR_MAX_SIZE):
+    """
+    Remove the least recently used assets until the store is no bigger than max_size.
+    The file with the hash `keep` (the one that's just been saved) is never removed,
+    even if it's bigger than max_size on its own.
+    """
+    total = db.execute(
+        "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT hash, size FROM assets)"
+    ).fetchone()[0]
+    if total <= max_size:
+        return
+    for asset_type, trove_id, level, content_hash, size in db.execute(
+        "SELECT type, trove_id, level, hash, size FROM assets WHERE hash != ? ORDER BY last_used",
+        (keep,),
+    ).fetchall():
+        db.execute(
+            "DELETE FROM assets WHERE type = ? AND trove_id = ? AND level = ?",
+            (asset_type, trove_id, level),
+        )
+        # Only delete the file if no other assets share it
+        if not db.execute(
+            "SELECT 1 FROM assets WHERE hash = ?", (content_hash,)
+        ).fetchone():
+            get_asset_path(content_hash).unlink(missing_ok=True)
+            total -= size
+            if total <= max_size:
+                break
+
+
+def get_asset(asset_type, trove_id, url, level=""):
+    """
+    Get a page image or PDF from the asset store, downloading it first if it's not already there.
+    Parameters:
+        asset_type - the type of resource, eg 'page' or 'issue-pdf'
+        trove_id - the Trove identifier of the resource
+        url - the url to download the resource from, or a function that returns the url
+              (so urls that are slow to prepare are only requested when they're needed)
+        level - the size of page images
+    Returns:
+        the path of the stored file
+    """
+    asset_path = find_asset(asset_type, trove_id, level)
+    if asset_path:
+        return asset_path
+    if callable(url):
+        url = url()
+    response = s.get(url, timeout=120)
+    response.raise_for_status()
+    content_hash = hashlib.sha256(response.content).hexdigest()
+    asset_path = get_asset_path(content_hash)
+    if not asset_path.exists():
+        asset_path.parent.mkdir(exist_ok=True)
+        # Write to a temporary file first, so nothing ever reads a partly saved file
+        with tempfile.NamedTemporaryFile(
+            dir=asset_path.parent, delete=False
+        ) as tmp_file:
+            tmp_file.write(response.content)
+        Path(tmp_file.name).replace(asset_path)
+    with closing(open_asset_manifest()) as db:
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    asset_type,
+                    str(trove_id),
+                    str(level),
+                    content_hash,
+                    len(response.content),
+                    time.time(),
+                ),
+            )
+            evict_assets(db, content_hash)
+    return asset_path
+
+
+def link_asset(asset_path, file_path):
+    """
+    Add a stored asset to a harvest as a hard link, so it doesn't use any more disk space.
+    If a hard link isn't possible (eg the harvest is on a different drive), the file is copied.
+    Harvested files are shared with the store, so don't edit them in place.
+    """
+    file_path = Path(file_path)
+    file_path.unlink(missing_ok=True)
+    try:
+        os.link(asset_path, file_path)
+    except OSError:
+        shutil.copyfile(asset_path, file_path)
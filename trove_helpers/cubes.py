@@ -0,0 +1,138 @@
+import datetime
+import hashlib
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from tqdm.auto import tqdm
+
+from .facets import get_facet
+
+
+def get_cube_cell(get_results, params, cell, decade, delay=0):
+    """
+    Get the number of results for each year in a decade, using the supplied facet values.
+    Parameters:
+        get_results - function that gets JSON response data from the Trove API
+        params - basic parameters to send to the API
+        cell - a dictionary of facet names and values
+        decade
+        delay - seconds to wait after the request, to keep under the API rate limit
+    Returns:
+        A list of dictionaries, one for every year in the decade (including years without results)
+    """
+    cell_params = {**params, **cell, "l-decade": decade, "facet": "year"}
+    data = get_results(cell_params)
+    if delay:
+        time.sleep(delay)
+    facets = get_facet(data)
+    counts = dict.fromkeys(range(decade * 10, decade * 10 + 10), 0)
+    counts.update(
+        zip(
+            facets["term"].astype(np.int64).tolist(),
+            facets["total_results"].tolist(),
+        )
+    )
+    return [
+        {**cell, "decade": decade, "year": year, "total_results": total}
+        for year, total in counts.items()
+    ]
+
+
+def get_facet_cube(
+    get_results,
+    params,
+    dimensions,
+    start_decade=180,
+    end_decade=202,
+    cache_file=None,
+    max_workers=4,
+    delay=0,
+):
+    """
+    Get the number of results per year for every combination of the supplied facet values.
+    Each combination of facet values and decade is a cell, and all the cells are requested concurrently.
+    If a cache file is supplied, the results are saved to it and cells that have already been harvested
+    are loaded from it – except for the current decade, which is always harvested again.
+    Parameters:
+        get_results - function that gets JSON response data from the Trove API
+        params - basic parameters to send to the API
+        dimensions - a dictionary with facet names as keys and lists of facet values, eg: {"l-state": ["Victoria", "Tasmania"]}
+        start_decade
+        end_decade
+        cache_file - path to a Parquet file, see get_cube_cache_file()
+        max_workers - the number of requests to make at the same time
+        delay - seconds each worker waits after a request, increase if you get 403 errors
+    Returns:
+        A dataframe with a column for each facet, plus 'year' and 'total_results'
+    """
+    names = list(dimensions)
+    params_key = json.dumps(params, sort_keys=True, default=str)
+    current_decade = datetime.date.today().year // 10
+    decades = range(start_decade, end_decade + 1)
+    df_cache = pd.DataFrame(columns=names + ["decade", "params"])
+    if cache_file and Path(cache_file).exists():
+        df_cache = pd.read_parquet(cache_file)
+    # Reuse cells harvested with the same parameters, except for the current decade
+    is_reusable = (df_cache["params"] == params_key) & (
+        df_cache["decade"] < current_decade
+    )
+    df_reused = df_cache.loc[is_reusable]
+    harvested = set(
+        zip(
+            df_reused[names].astype(str).apply(tuple, axis=1),
+            df_reused["decade"],
+        )
+    )
+    missing = [
+        (dict(zip(names, values)), decade)
+        for values in itertools.product(*dimensions.values())
+        for decade in decades
+        if (tuple(str(v) for v in values), decade) not in harvested
+    ]
+    rows = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(get_cube_cell, get_results, params, cell, decade, delay)
+            for cell, decade in missing
+        ]
+        for future in tqdm(as_completed(futures), total=len(futures), leave=False):
+            rows += future.result()
+    df_new = pd.DataFrame(rows, columns=names + ["decade", "year", "total_results"])
+    df_new["params"] = params_key
+    df = pd.concat([df_reused, df_new], ignore_index=True)
+    if cache_file:
+        Path(cache_file).parent.mkdir(parents=True, exist_ok=True)
+        # Keep cells harvested with other parameters
+        df_others = df_cache.loc[df_cache["params"] != params_key]
+        pd.concat([df_others, df], ignore_index=True).to_parquet(
+            cache_file, index=False
+        )
+    # Only return the requested cells that have results
+    is_requested = df["decade"].isin(decades) & (df["total_results"] > 0)
+    for name, values in dimensions.items():
+        is_requested &= df[name].astype(str).isin([str(v) for v in values])
+    return (
+        df.loc[is_requested, names + ["year", "total_results"]]
+        .astype({"year": int, "total_results": int})
+        .sort_values(names + ["year"])
+        .reset_index(drop=True)
+    )
+
+
+def get_cube_cache_file(params, dimensions):
+    """
+    Get the path of a Parquet file to cache the results of a facet cube harvest.
+    Each combination of parameters (including the query) and facet names gets its own file
+    in data/facet-cubes, so searches don't have to load each other's results.
+    """
+    key = json.dumps([params, list(dimensions)], sort_keys=True, default=str)
+    return Path(
+        "data",
+        "facet-cubes",
+        f"{hashlib.sha256(key.encode()).hexdigest()[:16]}.parquet",
+    )
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def decode_facets(data):
+    """
+    Extract the terms and counts of every facet in a Trove API response.
+    Rather than building a dictionary for each term, the terms and counts are collected
+    as columns, and the counts are converted to integers all at once by NumPy.
+    Parameters:
+        data  - JSON formatted response data from Trove API
+    Returns:
+        A dictionary with facet names as keys, and dictionaries of columns – 'term' and 'total_results' – as values
+    """
+    facets = {}
+    try:
+        # The facets are buried a fair way down in the results
+        response_facets = data["category"][0]["facets"]["facet"]
+    except (TypeError, KeyError, IndexError):
+        return facets
+    for facet in response_facets:
+        terms = facet.get("term", [])
+        facets[facet["name"]] = {
+            "term": np.array([term["search"] for term in terms], dtype=str),
+            "total_results": np.array(
+                [term["count"] for term in terms], dtype=np.int64
+            ),
+        }
+    return facets
+
+
+def get_facet(data, name=None):
+    """
+    Get the terms and counts of a single facet in a Trove API response.
+    Parameters:
+        data  - JSON formatted response data from Trove API
+        name  - the name of the facet, if not supplied the first facet is used
+    Returns:
+        A dictionary of columns: 'term', 'total_results' (empty if the facet is missing)
+    """
+    facets = decode_facets(data)
+    if name is None:
+        name = next(iter(facets), None)
+    return facets.get(
+        name,
+        {
+            "term": np.array([], dtype=str),
+            "total_results": np.array([], dtype=np.int64),
+        },
+    )
@@ -0,0 +1,113 @@
+import math
+from io import BytesIO
+
+import requests
+from PIL import Image, ImageFile
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+from .assets import find_asset, get_asset
+
+IMAGE_URL = "https://trove.nla.gov.au/ndp/imageservice/nla.news-page{}/level{}"
+
+# The highest resolution page images -- article coordinates refer to this level
+MAX_LEVEL = 7
+
+# Dimensions of page images at each level, so they're only looked up once
+level_sizes = {}
+
+# Page image headers are never saved in a notebook's requests cache
+s = requests.Session()
+retries = Retry(total=5, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
+s.mount("http://", HTTPAdapter(max_retries=retries))
+s.mount("https://", HTTPAdapter(max_retries=retries))
+
+
+def get_level_size(page_id, level):
+    """
+    Get the dimensions of a page image at the given level by reading just the start of the JPEG file.
+    If the page image is in the asset store, the stored file is used instead.
+    Returns None if the dimensions can't be read from the start of the file.
+    """
+    if (page_id, level) not in level_sizes:
+        asset_path = find_asset("page", page_id, level)
+        if asset_path:
+            # Page images that are already in the asset store can be read locally
+            with Image.open(asset_path) as img:
+                level_sizes[(page_id, level)] = img.size
+        else:
+            parser = ImageFile.Parser()
+            with s.get(
+                IMAGE_URL.format(page_id, level), stream=True, timeout=120
+            ) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=4096):
+                    parser.feed(chunk)
+                    if parser.image:
+                        break
+            # Don't save a failed lookup, so it's tried again next time
+            if not parser.image:
+                return None
+            level_sizes[(page_id, level)] = parser.image.size
+    return level_sizes[(page_id, level)]
+
+
+def choose_level(page_id, box, size):
+    """
+    Find the lowest image level at which the box is still at least `size` pixels across.
+    Levels whose dimensions can't be read are skipped, and if the dimensions of the
+    highest resolution image can't be read, the highest resolution image is used.
+    Returns the level, and the scale of images at that level compared to the highest resolution.
+    """
+    if not size:
+        return MAX_LEVEL, 1.0
+    full_size = get_level_size(page_id, MAX_LEVEL)
+    if not full_size:
+        return MAX_LEVEL, 1.0
+    box_size = max(box["right"] - box["left"], box["bottom"] - box["top"])
+    for level in range(1, MAX_LEVEL):
+        level_size = get_level_size(page_id, level)
+        if not level_size:
+            continue
+        scale = level_size[0] / full_size[0]
+        if box_size * scale >= size:
+            return level, scale
+    return MAX_LEVEL, 1.0
+
+
+def decode_crop(image_data, box, scale=1.0, size=None):
+    """
+    Decode a page image and crop it to the box (which uses full resolution coordinates).
+    If a size is given, JPEG draft mode is used to decode the image at the smallest scale
+    that leaves the box at least `size` pixels across, so the full bitmap is never created.
+    """
+    img = Image.open(BytesIO(image_data))
+    width, height = img.size
+    box_size = max(box["right"] - box["left"], box["bottom"] - box["top"]) * scale
+    if size and box_size > size:
+        reduction = box_size / size
+        img.draft(
+            img.mode, (math.ceil(width / reduction), math.ceil(height / reduction))
+        )
+        scale *= img.size[0] / width
+    points = [round(box[side] * scale) for side in ["left", "top", "right", "bottom"]]
+    return img.crop(points)
+
+
+def get_page_data(page_id, level):
+    """
+    Get a page image at the given level, downloading it if it's not already in the asset store.
+    """
+    return get_asset(
+        "page", page_id, IMAGE_URL.format(page_id, level), level
+    ).read_bytes()
+
+
+def get_page_crop(page_id, box, size=None):
+    """
+    Get an image of the box on a page that's at least `size` pixels across,
+    downloading the smallest suitable page image.
+    If size is None, the box is cropped from the highest resolution page image.
+    """
+    level, scale = choose_level(page_id, box, size)
+    return decode_crop(get_page_data(page_id, level), box, scale, size)
@@ -0,0 +1,130 @@
+import json
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+TITLE_REGISTRY = Path("data", "trove-titles.db")
+
+# Sync the registry with the API if it's older than this
+REGISTRY_MAX_AGE = timedelta(days=7)
+
+# Titles are always requested from the API (never from a notebook's cache),
+# so a sync sees the current list
+s = requests.Session()
+retries = Retry(total=5, backoff_factor=1, status_forcelist=[502, 503, 504])
+s.mount("http://", HTTPAdapter(max_retries=retries))
+s.mount("https://", HTTPAdapter(max_retries=retries))
+
+
+def sync_titles(db, title_type, api_key):
+    """
+    Compare the titles saved in the registry with the current list from the Trove API,
+    updating only the titles that have been added, changed, or removed.
+    Parameters:
+        db - connection to the title registry
+        title_type - either 'newspaper' or 'gazette'
+        api_key - a Trove API key
+    """
+    response = s.get(
+        f"https://api.trove.nla.gov.au/v3/{title_type}/titles",
+        params={"encoding": "json"},
+        headers={"X-API-KEY": api_key},
+        timeout=60,
+    )
+    response.raise_for_status()
+    titles = {title["id"]: title for title in response.json()[title_type]}
+    saved = dict(
+        db.execute("SELECT id, record FROM titles WHERE type = ?", (title_type,))
+    )
+    changed = []
+    for title_id, title in titles.items():
+        record = json.dumps(title, sort_keys=True)
+        if saved.get(title_id) != record:
+            changed.append(
+                (
+                    title_id,
+                    title_type,
+                    title["title"],
+                    title.get("state"),
+                    title.get("startDate"),
+                    title.get("endDate"),
+                    record,
+                )
+            )
+    removed = [(title_id, title_type) for title_id in saved.keys() - titles.keys()]
+    with db:
+        db.executemany(
+            "INSERT OR REPLACE INTO titles VALUES (?, ?, ?, ?, ?, ?, ?)", changed
+        )
+        db.executemany("DELETE FROM titles WHERE id = ? AND type = ?", removed)
+        db.execute(
+            "INSERT OR REPLACE INTO syncs VALUES (?, ?)",
+            (title_type, datetime.now().isoformat()),
+        )
+
+
+@contextmanager
+def open_title_registry(api_key, title_types=("newspaper",), max_age=REGISTRY_MAX_AGE):
+    """
+    Open the local registry of Trove titles, syncing it with the API if it's out of date.
+    The registry is a SQLite database with indexes on title id, state, and type,
+    so lookups and joins don't need any more API requests.
+    Use it in a `with` statement, so the connection is closed when you're finished.
+    Parameters:
+        api_key - a Trove API key
+        title_types - the types of title to include, 'newspaper' and/or 'gazette'
+        max_age - sync with the API if the registry is older than this
+    Returns:
+        A connection to the registry database
+    """
+    TITLE_REGISTRY.parent.mkdir(parents=True, exist_ok=True)
+    with closing(sqlite3.connect(TITLE_REGISTRY)) as db:
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS titles (
+                id TEXT,
+                type TEXT,
+                title TEXT,
+                state TEXT,
+                start_date TEXT,
+                end_date TEXT,
+                record TEXT,
+                PRIMARY KEY (id, type)
+            );
+            CREATE INDEX IF NOT EXISTS titles_state ON titles (state);
+            CREATE INDEX IF NOT EXISTS titles_type ON titles (type);
+            CREATE TABLE IF NOT EXISTS syncs (type TEXT PRIMARY KEY, synced TEXT);
+            """)
+        for title_type in title_types:
+            synced = db.execute(
+                "SELECT synced FROM syncs WHERE type = ?", (title_type,)
+            ).fetchone()
+            if (
+                not synced
+                or datetime.now() - datetime.fromisoformat(synced[0]) > max_age
+            ):
+                sync_titles(db, title_type, api_key)
+        yield db
+
+
+def get_registry_titles(api_key, title_type="newspaper"):
+    """
+    Get the full API records of all the titles of the given type in the registry, sorted by title.
+    Parameters:
+        api_key - a Trove API key
+        title_type - either 'newspaper' or 'gazette'
+    Returns:
+        A list of title records
+    """
+    with open_title_registry(api_key, title_types=(title_type,)) as db:
+        return [
+            json.loads(record)
+            for (record,) in db.execute(
+                "SELECT record FROM titles WHERE type = ? ORDER BY title",
+                (title_type,),
+            )
+        ]